@@ -2,21 +2,59 @@ import os
 import time
 import zipfile
 import io
+import json
+import re
 import sys
 import asyncio
+import hashlib
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import streamlit as st
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import cloudinary
+import cloudinary.exceptions
 import cloudinary.uploader
-from pyairtable import Api
+import cloudinary.utils
+import certifi
+import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt.multipart.encoder import MultipartEncoder
+from urllib3.util.retry import Retry
 import subprocess
-import os
+from pathlib import Path
+
+
+def chromium_installed():
+    """Cheap filesystem probe for a Playwright-managed Chromium, avoiding a `playwright install` subprocess.
+
+    Looks for the exact revisions the installed Playwright pins in its browsers.json (Chromium and the headless
+    shell that headless launches use), so a cache left behind by an older Playwright doesn't count.
+    """
+    browsers_path = os.environ.get("PLAYWRIGHT_BROWSERS_PATH", str(Path.home() / ".cache" / "ms-playwright"))
+    if browsers_path == "0":
+        return False  # browsers live inside the package; let `playwright install` work it out
+    try:
+        import playwright
+        manifest = Path(playwright.__file__).parent / "driver" / "package" / "browsers.json"
+        browsers = json.loads(manifest.read_text())["browsers"]
+    except (ImportError, OSError, ValueError, KeyError):
+        return False
+    folders = [f"{b['name'].replace('-', '_')}-{b['revision']}" for b in browsers
+               if b.get('name') in ("chromium", "chromium-headless-shell")]
+    # Playwright writes the marker last, so an interrupted download isn't mistaken for an install
+    return bool(folders) and all((Path(browsers_path) / folder / "INSTALLATION_COMPLETE").exists()
+                                 for folder in folders)
 
 
 # Check if chromium is installed, if not, install it
 # Check if chromium and fonts are installed, if not, install them
 @st.cache_resource
 def install_playwright_browsers():
+    if chromium_installed():
+        return
     try:
         # We no longer run apt-get here because packages.txt handles it
         # Just install the Playwright chromium binary
@@ -35,16 +73,30 @@ try:
 except ImportError:
     pass  # dotenv not installed, will use system env variables
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None  # xxhash not installed, image_signature falls back to hashlib
+
 # Windows-specific fix for Python 3.13 + Playwright subprocess error
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
 
-from playwright.sync_api import sync_playwright, ViewportSize
+from playwright.sync_api import sync_playwright, ViewportSize, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
 
 # --- CONFIGURATION ---
 UPLOAD_FOLDER = 'static/captures'
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Keep only the last 50 logs to prevent memory/app reset issues
+LOG_MAX_LINES = 50
+
+# Minimum seconds between Activity Log redraws while a capture is running
+LOG_RENDER_INTERVAL = 0.25
+
+# Minimum seconds between batch progress bar updates (the final one is always sent)
+PROGRESS_UPDATE_INTERVAL = 0.1
+
 
 # Helper function to get config from Streamlit secrets or environment variables
 def get_config(key, default=None):
@@ -74,72 +126,171 @@ if all([CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET]):
         secure=True
     )
 
-# Fix SSL certificate verification issues
-import ssl
-import certifi
-import urllib3
+st.set_page_config(page_title="Banner Capture", layout="wide")
 
-urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-ssl._create_default_https_context = ssl._create_unverified_context
 
-st.set_page_config(page_title="Banner Capture", layout="wide")
+@st.cache_resource
+def get_http_session():
+    """Shared keep-alive session for Cloudinary/Airtable REST calls (one TLS handshake per host)."""
+    session = requests.Session()
+    session.verify = certifi.where()
+    # Only idempotent methods (urllib3's default set) are replayed here: a POST/PATCH that hit a 5xx may already
+    # have been committed. Airtable writes therefore get no retries (or Retry-After handling) from this session;
+    # their 429s are retried by with_backoff, which waits for the Retry-After the response asks for
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504])
+    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=32, max_retries=retry))
+    # Streamed Cloudinary uploads can't be rewound for a transparent retry, so that host only retries
+    # failed connects here; throttling/5xx retries happen in with_backoff, which rebuilds the body
+    session.mount("https://api.cloudinary.com", HTTPAdapter(pool_connections=16, pool_maxsize=32,
+                                                            max_retries=Retry(total=3, read=0)))
+    return session
+
+
+def submit_with_ctx(executor, fn, *args, **kwargs):
+    """Submit fn to a background executor with the caller's Streamlit script context attached."""
+    ctx = get_script_run_ctx()
+
+    def call():
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return fn(*args, **kwargs)
+
+    return executor.submit(call)
+
+
+def _is_retryable(error):
+    """Retry throttling and server-side failures; give up on any other client error."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              cloudinary.exceptions.RateLimited, cloudinary.exceptions.GeneralError))
+
+
+def _is_throttled(error):
+    """A 429 is rejected before any processing, so even a non-idempotent request is safe to replay."""
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        return error.response.status_code == 429
+    return isinstance(error, cloudinary.exceptions.RateLimited)
+
+
+def _retry_after(error):
+    """Seconds a 429 response asks us to wait via Retry-After, or None if it doesn't say."""
+    response = getattr(error, 'response', None)
+    if response is None or response.status_code != 429:
+        return None
+    try:
+        return max(0.0, float(response.headers.get('Retry-After')))
+    except (TypeError, ValueError):
+        return None
+
+
+def with_backoff(fn, *args, max_tries=5, base_delay=0.5, retryable=_is_retryable, throttle_delay=None, **kwargs):
+    """Call fn, retrying errors that `retryable` accepts with exponential backoff (0.5s, 1s, 2s, ...).
+
+    A 429 waits for its Retry-After header instead; without one, `throttle_delay` (if given) is used.
+    """
+    for attempt in range(max_tries):
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if attempt == max_tries - 1 or not retryable(e):
+                raise
+            delay = _retry_after(e)
+            if delay is None:
+                delay = throttle_delay if throttle_delay is not None and _is_throttled(e) else base_delay * 2 ** attempt
+            time.sleep(delay)
 
 
 # --- CLOUDINARY UPLOAD ---
 
-def upload_to_cloudinary(file_path, country_code, mode, slide_num):
-    """Upload image to Cloudinary and return the URL."""
+# Uploads are network-bound, so they run beside the capture instead of blocking the next slide
+UPLOAD_WORKERS = 8
+
+
+@st.cache_resource
+def _upload_executor():
+    """Process-wide pool for Cloudinary uploads."""
+    return ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+# Process-wide caps shared by every browser session: bursts beyond these trigger 429s
+# (Airtable allows 5 requests/s per base)
+@st.cache_resource
+def _cloudinary_slots():
+    return threading.BoundedSemaphore(20)
+
+
+@st.cache_resource
+def _airtable_slots():
+    return threading.BoundedSemaphore(4)
+
+
+def upload_to_cloudinary(image_bytes, filename, country_code, mode, slide_num, capture_stamp):
+    """Upload in-memory image bytes to Cloudinary and return the URL."""
     if not all([CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET]):
         st.warning("⚠️ Cloudinary credentials not configured. Please set them in .env file or Streamlit secrets.")
         return None, None
 
     try:
-        import hashlib
-        import base64
-
-        # Generate timestamp
-        timestamp = int(time.time())
-
         # Prepare upload parameters
         folder_name = f"lg_banners/{country_code}/{mode}"
-        public_id = f"{country_code}_{mode}_hero_{slide_num}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        public_id = f"{country_code}_{mode}_hero_{slide_num}_{capture_stamp}"
 
-        # Method 1: Try using cloudinary SDK with proper config
-        try:
-            response = cloudinary.uploader.upload(
-                file_path,
+        def sdk_upload():
+            # Method 1: Try using cloudinary SDK with proper config
+            return cloudinary.uploader.upload(
+                image_bytes,
                 folder=folder_name,
                 public_id=public_id,
                 resource_type="image",
                 overwrite=True,
                 use_filename=False
             )
-            return response.get('secure_url'), response.get('public_id')
-        except Exception as sdk_error:
-            # Method 2: Fallback to direct API call with proper signature
-            import requests
 
-            # Create signature for authentication
-            params_to_sign = f"folder={folder_name}&public_id={public_id}&timestamp={timestamp}{CLOUDINARY_API_SECRET}"
-            signature = hashlib.sha1(params_to_sign.encode('utf-8')).hexdigest()
+        def rest_upload():
+            # Method 2: Fallback to direct API call with proper signature
+            # Signatures expire after an hour, so the timestamp is taken per attempt rather than up front
+            timestamp = int(time.time())
+            # The SDK's signer sorts and encodes the parameters exactly as the API expects
+            signature = cloudinary.utils.api_sign_request(
+                {'folder': folder_name, 'public_id': public_id, 'timestamp': timestamp}, CLOUDINARY_API_SECRET)
 
             url = f"https://api.cloudinary.com/v1_1/{CLOUDINARY_CLOUD_NAME}/image/upload"
 
-            with open(file_path, 'rb') as f:
-                files = {'file': f}
-                data = {
-                    'api_key': CLOUDINARY_API_KEY,
-                    'timestamp': timestamp,
-                    'signature': signature,
-                    'folder': folder_name,
-                    'public_id': public_id
-                }
+            # Stream the multipart body instead of concatenating it into one more copy of the image.
+            # The encoder can't be rewound, so each retry builds a new one over a fresh BytesIO.
+            encoder = MultipartEncoder(fields={
+                'file': (filename, io.BytesIO(image_bytes), 'image/jpeg'),
+                'api_key': CLOUDINARY_API_KEY,
+                'timestamp': str(timestamp),
+                'signature': signature,
+                'folder': folder_name,
+                'public_id': public_id
+            })
+
+            response = get_http_session().post(url, data=encoder, headers={'Content-Type': encoder.content_type})
+            response.raise_for_status()
+            return response.json()
 
-                response = requests.post(url, files=files, data=data, verify=False)
-                response.raise_for_status()
-                result = response.json()
+        use_rest = False
 
-                return result.get('secure_url'), result.get('public_id')
+        def attempt_upload():
+            nonlocal use_rest
+            # A slot is held per attempt, not across backoff sleeps
+            with _cloudinary_slots():
+                if not use_rest:
+                    try:
+                        return sdk_upload()
+                    except Exception as sdk_error:
+                        # Cloudinary throttles the REST endpoint too, so back off instead of falling back
+                        if _is_throttled(sdk_error):
+                            raise
+                        # Any other SDK failure switches this and the remaining attempts to REST
+                        use_rest = True
+                return rest_upload()
+
+        # One backoff budget covers the SDK call and its fallback
+        result = with_backoff(attempt_upload)
+        return result.get('secure_url'), result.get('public_id')
 
     except Exception as e:
         st.error(f"❌ Cloudinary upload failed: {str(e)}")
@@ -148,121 +299,486 @@ def upload_to_cloudinary(file_path, country_code, mode, slide_num):
 
 # --- AIRTABLE INTEGRATION ---
 
-def save_to_airtable(country_code, mode, urls, full_country_name):
-    """Save all capture URLs to a single Airtable record."""
-    if not all([AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME]):
-        st.warning("⚠️ Airtable credentials not configured. Please set them in .env file or Streamlit secrets.")
-        return None
+# Airtable accepts at most 10 records per create call
+AIRTABLE_BATCH_SIZE = 10
 
-    try:
-        # Determine banner type and record name
-        banner_type_label = "hero-banner-pc" if mode.lower() == "desktop" else "hero-banner-mo"
-        mode_suffix = "pc" if mode.lower() == "desktop" else "mobile"
-        record_name = f"{country_code.lower()}-hero-banner-{mode_suffix}-gp1"
-        capture_date = datetime.now().strftime('%m/%d/%Y')
-        
-        # Format the URLs as a single string (newline separated)
-        url_text = ", ".join(urls)
+# Airtable locks a throttled base out for 30 seconds, so a 429 without Retry-After waits that long
+AIRTABLE_THROTTLE_DELAY = 30
 
-        # Method 1: Try using pyairtable with SSL fix
-        try:
-            api = Api(AIRTABLE_API_KEY)
-            table = api.table(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
-
-            record = {
-                "domain": country_code,
-                "country": full_country_name,
-                "period": capture_date,
-                "banner-type": banner_type_label,
-                "URLs": url_text
-            }
 
-            created_record = table.create(record)
-            return created_record['id']
+def enqueue_airtable_record(pending, country_code, mode, urls, full_country_name, period):
+    """Queue one capture record (all URLs for a country) for the next batched Airtable write.
 
-        except Exception as pyairtable_error:
-            # Method 2: Fallback to direct requests API call
-            import requests
+    `period` is the run's date ('%m/%d/%Y'), formatted once by the caller for every record of the run.
+    """
+    banner_type_label = "hero-banner-pc" if mode.lower() == "desktop" else "hero-banner-mo"
+    pending.append({
+        "domain": country_code,
+        "country": full_country_name,
+        "period": period,
+        "banner-type": banner_type_label,
+        # Format the URLs as a single comma separated string
+        "URLs": ", ".join(urls)
+    })
 
-            url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
 
-            headers = {
-                "Authorization": f"Bearer {AIRTABLE_API_KEY}",
-                "Content-Type": "application/json"
-            }
+@st.cache_resource
+def _airtable_record_ids():
+    """Process-wide (domain, banner-type, period) -> record ID map, so same-day re-runs update instead of duplicating."""
+    return {}
 
-            data = {
-                "fields": {
-                    "domain": country_code,
-                    "country": full_country_name,
-                    "period": capture_date,
-                    "banner-type": banner_type_label,
-                    "URLs": url_text
-                }
-            }
 
-            response = requests.post(url, json=data, headers=headers, verify=False)
+def _airtable_record_key(fields):
+    return fields["domain"], fields["banner-type"], fields["period"]
+
+
+def _send_airtable_batches(method, records):
+    """Send records to the Airtable REST endpoint in chunks of 10.
+
+    Returns two lists with one entry per input record: the written record (or None), and the error its chunk
+    failed with (or None). A failed chunk doesn't abort the rest of the batch.
+    """
+    url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
+
+    headers = {
+        "Authorization": f"Bearer {AIRTABLE_API_KEY}",
+        "Content-Type": "application/json"
+    }
+
+    written = []
+    errors = []
+    for start in range(0, len(records), AIRTABLE_BATCH_SIZE):
+        chunk = records[start:start + AIRTABLE_BATCH_SIZE]
+        data = {"records": chunk, "typecast": True}
+
+        def send():
+            response = get_http_session().request(method, url, json=data, headers=headers)
             response.raise_for_status()
-            result = response.json()
+            return response.json().get('records', [])
+
+        try:
+            # Only throttled writes are replayed; a 5xx may come after Airtable already stored the records
+            written.extend(with_backoff(send, retryable=_is_throttled, throttle_delay=AIRTABLE_THROTTLE_DELAY))
+            errors.extend([None] * len(chunk))
+        except requests.RequestException as e:
+            written.extend([None] * len(chunk))
+            errors.extend([e] * len(chunk))
+
+    return written, errors
+
+
+def _is_missing_record(error):
+    """True when Airtable rejected an update because a record ID no longer exists (404, or 422 ROW_DOES_NOT_EXIST)."""
+    response = getattr(error, 'response', None)
+    if response is None:
+        return False
+    if response.status_code == 404:
+        return True
+    if response.status_code != 422:
+        return False
+    try:
+        detail = response.json().get('error')
+    except ValueError:
+        return False
+    error_type = detail.get('type') if isinstance(detail, dict) else detail
+    return error_type == 'ROW_DOES_NOT_EXIST'
+
+
+def flush_airtable_records(pending):
+    """Write all queued records to Airtable in batches of 10 and clear the queue. Returns the written record IDs."""
+    if not pending:
+        return []
+
+    if not all([AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME]):
+        st.warning("⚠️ Airtable credentials not configured. Please set them in .env file or Streamlit secrets.")
+        pending.clear()
+        return []
+
+    records = list(pending)
+    pending.clear()
 
-            return result.get('id')
+    # Records already written today for the same country/banner type are updated in place
+    known_ids = _airtable_record_ids()
+    updates = [{"id": known_ids[_airtable_record_key(f)], "fields": f} for f in records
+               if _airtable_record_key(f) in known_ids]
+    creates = [f for f in records if _airtable_record_key(f) not in known_ids]
+
+    try:
+        # Straight to the REST batch endpoint on the pooled session, one request per 10 records
+        with _airtable_slots():
+            updated_records, update_errors = _send_airtable_batches("PATCH", updates) if updates else ([], [])
+
+            # One stale ID makes Airtable reject its whole chunk, so the records of such a chunk are re-sent
+            # one at a time: the valid ones are updated in place, and only a record that is really gone
+            # loses its cached ID and is created again. Any other failure may already have been applied.
+            for i, error in enumerate(update_errors):
+                if error is None or not _is_missing_record(error):
+                    continue
+                [updated_records[i]], [update_errors[i]] = _send_airtable_batches("PATCH", [updates[i]])
+                if update_errors[i] is not None and _is_missing_record(update_errors[i]):
+                    known_ids.pop(_airtable_record_key(updates[i]["fields"]), None)
+                    creates.append(updates[i]["fields"])
+                    update_errors[i] = None
+
+            created_records, create_errors = (_send_airtable_batches("POST", [{"fields": f} for f in creates])
+                                              if creates else ([], []))
+
+        for fields, record in zip(creates, created_records):
+            if record:
+                known_ids[_airtable_record_key(fields)] = record['id']
+
+        failures = [e for e in update_errors + create_errors if e is not None]
+        if failures:
+            # A failed chunk reports the same error for each of its records, so list each one once
+            reasons = dict.fromkeys(str(e) for e in failures)
+            st.warning(f"⚠️ {len(failures)} Airtable record(s) not saved: " + "; ".join(reasons))
+
+        return [r['id'] for r in updated_records + created_records if r]
 
     except Exception as e:
         st.error(f"❌ Airtable save failed: {str(e)}")
-        return None
+        return []
+
+
+# Failures raise, and st.cache_data never caches exceptions, so only successful probes are skipped
+@st.cache_data(ttl=300, show_spinner=False)
+def _probe_airtable_read(base_id, table_name):
+    """Check READ access to the capture table."""
+    read_url = f"https://api.airtable.com/v0/{base_id}/{table_name}"
+    headers = {"Authorization": f"Bearer {AIRTABLE_API_KEY}"}
+    read_response = get_http_session().get(read_url, headers=headers)
+    if read_response.status_code != 200:
+        raise RuntimeError(f"READ failed: {read_response.text}")
+    return True
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _probe_airtable_write(base_id, table_name):
+    """Check WRITE access by creating and deleting a test record."""
+    http = get_http_session()
+    write_url = f"https://api.airtable.com/v0/{base_id}/{table_name}"
+    headers = {"Authorization": f"Bearer {AIRTABLE_API_KEY}"}
+    write_data = {
+        "fields": {
+            "country": "Australia",
+            "period": datetime.now().strftime('%m/%d/%Y'),
+            "banner-type": "hero-banner-pc",
+        }
+    }
+    write_response = http.post(write_url, json=write_data, headers=headers)
+    if write_response.status_code != 200:
+        raise RuntimeError(f"WRITE failed: {write_response.text}")
+
+    # Cleanup test record
+    record_id = write_response.json().get('id')
+    http.delete(f"{write_url}/{record_id}", headers=headers)
+    return True
+
+
+# --- BROWSER POOL ---
+
+BROWSER_ARGS = [
+    "--no-sandbox",
+    "--disable-setuid-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu"
+]
+
+# Number of countries captured in parallel (one browser per worker); tune per host memory
+CAPTURE_WORKERS = int(get_config("CAPTURE_WORKERS", 4))
+
+# A site whose navigation fails (timeout, dropped connection) or whose browser disconnects before any slide
+# is captured is retried on a fresh context with exponential backoff (2s, 4s, ...)
+CAPTURE_ATTEMPTS = 3
+CAPTURE_RETRY_DELAY = 2
+
+
+@st.cache_resource
+def _browser_local():
+    """Process-wide holder for warm browsers (sync Playwright handles are bound to the thread that started them)."""
+    return threading.local()
+
+
+@st.cache_resource
+def _capture_executor():
+    """Long-lived capture threads, each owning a warm browser across Streamlit reruns."""
+    # Bounded: every worker holds its own Chromium, so unbounded parallel captures would exhaust memory
+    return ThreadPoolExecutor(max_workers=CAPTURE_WORKERS, thread_name_prefix="capture")
+
+
+def get_browser():
+    """Return the (playwright, browser) pair for the current thread, launching Chromium on first use."""
+    local = _browser_local()
+    if getattr(local, 'playwright', None) is None:
+        # Keep the started Playwright on the holder so it isn't garbage collected between captures
+        local.playwright = sync_playwright().start()
+    # Relaunch if Chromium crashed, so a retried capture doesn't land on a dead browser
+    if getattr(local, 'browser', None) is None or not local.browser.is_connected():
+        local.browser = local.playwright.chromium.launch(headless=True, args=BROWSER_ARGS)
+    return local.playwright, local.browser
+
+
+@st.cache_resource
+def prewarm_capture_pool():
+    """Launch every capture worker's browser in the background once per process, ahead of the first click."""
+    # The barrier holds each warm-up task on its own thread, so no worker is left to start Chromium later
+    barrier = threading.Barrier(CAPTURE_WORKERS)
+
+    def warm_up():
+        try:
+            get_browser()
+        finally:
+            # A failed launch still releases the others; the first real capture retries the launch
+            try:
+                barrier.wait(timeout=60)
+            except threading.BrokenBarrierError:
+                pass
+
+    return [_capture_executor().submit(warm_up) for _ in range(CAPTURE_WORKERS)]
+
+
+def start_capture(url, country_code, mode, events, tag=None, upload_to_cloud=False, save_local=False, cancel=None):
+    """
+    Submit capture_hero_banners to the capture pool.
+    Puts (tag, kind, payload) events on `events`: 'start', then 'log' / 'result' as they happen, then 'done'.
+    """
+
+    def worker():
+        try:
+            if cancel is not None and cancel.is_set():
+                return
+            events.put((tag, 'start', None))
+            for attempt in range(CAPTURE_ATTEMPTS):
+                try:
+                    for result in capture_hero_banners(url, country_code, mode,
+                                                       log_callback=lambda m: events.put((tag, 'log', m)),
+                                                       upload_to_cloud=upload_to_cloud, save_local=save_local):
+                        events.put((tag, 'result', result))
+                    break
+                except PlaywrightError as e:
+                    if attempt == CAPTURE_ATTEMPTS - 1 or (cancel is not None and cancel.is_set()):
+                        events.put((tag, 'log', f"❌ Error: {str(e)}"))
+                        break
+                    delay = CAPTURE_RETRY_DELAY * 2 ** attempt
+                    events.put((tag, 'log', f"🔁 Capture failed ({str(e).splitlines()[0]}). Retrying in {delay}s..."))
+                    time.sleep(delay)
+                except Exception as e:
+                    # e.g. the session folder write failing before the capture starts: report it, never crash the run
+                    events.put((tag, 'log', f"❌ Error: {str(e)}"))
+                    break
+        finally:
+            events.put((tag, 'done', None))
+
+    return submit_with_ctx(_capture_executor(), worker)
+
+
+def run_capture(url, country_code, mode, log_callback=None, upload_to_cloud=False, save_local=False, on_idle=None):
+    """
+    Run capture_hero_banners on a capture thread and relay its results back to the caller.
+    Log messages are forwarded through a queue so Streamlit UI updates stay on the script thread.
+    `on_idle` is called whenever no event arrives for LOG_RENDER_INTERVAL (e.g. during a slow page load).
+    """
+    events = queue.Queue()
+    future = start_capture(url, country_code, mode, events, upload_to_cloud=upload_to_cloud, save_local=save_local)
+    while True:
+        try:
+            _, kind, payload = events.get(timeout=LOG_RENDER_INTERVAL)
+        except queue.Empty:
+            if on_idle:
+                on_idle()
+            continue
+        if kind == 'log':
+            if log_callback:
+                log_callback(payload)
+        elif kind == 'result':
+            yield payload
+        elif kind == 'done':
+            break
+    future.result()
 
 
 # --- CORE CAPTURE LOGIC (Enhanced with Hero Detection) ---
 
-def apply_clean_styles(page_obj):
-    """Comprehensive CSS cleanup with Sharpening and Speed fixes."""
-    page_obj.evaluate("""
-        document.querySelectorAll('.c-notification-banner').forEach(el => el.remove());
-        const style = document.createElement('style');
-        style.innerHTML = `
-            [class*="chat"], [id*="chat"], [class*="proactive"], 
-        .alk-container, #genesys-chat, .genesys-messenger,
-        .floating-button-portal, #WAButton, .embeddedServiceHelpButton,
-        .c-pop-toast__container, .onetrust-pc-dark-filter, #onetrust-consent-sdk,
-        .c-membership-popup, 
-        [class*="cloud-shoplive"], [class*="csl-"], [class*="svelte-"], 
-        .l-cookie-teaser, .c-cookie-settings, .LiveMiniPreview,
-        .c-notification-banner, .c-notification-banner *, .c-notification-banner__wrap,
-        .open-button, .js-video-pause, .js-video-play, [aria-label*="Pausar"], [aria-label*="video"]
-            { display: none !important; visibility: hidden !important; opacity: 0 !important; pointer-events: none !important; }
-
-            /* SPEED: Disable transitions for instant navigation */
-            *, *::before, *::after {
-                transition-duration: 0s !important;
-                animation-duration: 0s !important;
-                transition-delay: 0s !important;
-                animation-delay: 0s !important;
+# Network blocking: chat widgets, analytics/consent beacons and heavy media never affect the hero screenshot.
+# Fonts are deliberately NOT blocked: banner headlines are set in web fonts and must render faithfully.
+CHAT_KEYWORDS = ("genesys", "liveperson", "salesforceliveagent", "adobe-privacy", "chatbot", "proactive-chat")
+ANALYTICS_DOMAINS = ("google-analytics", "googletagmanager", "doubleclick", "adobe.com/b/ss", "hotjar", "onetrust",
+                     "cookielaw", "newrelic", "nr-data.net", "optimizely")
+BLOCKED_URL_KEYWORDS = CHAT_KEYWORDS + ANALYTICS_DOMAINS
+# The route handler runs for every request, so match all keywords in one precompiled scan
+BLOCKED_URL_RE = re.compile("|".join(map(re.escape, BLOCKED_URL_KEYWORDS)), re.IGNORECASE)
+# Blocking media (autoplay MP4s) also avoids decoding whole video buffers behind the hero
+BLOCKED_RESOURCE_TYPES = {"media", "texttrack", "websocket", "eventsource", "manifest"}
+
+
+CLEAN_CSS = """
+    [class*="chat"], [id*="chat"], [class*="proactive"],
+    .alk-container, #genesys-chat, .genesys-messenger,
+    .floating-button-portal, #WAButton, .embeddedServiceHelpButton,
+    .c-pop-toast__container, .onetrust-pc-dark-filter, #onetrust-consent-sdk,
+    .c-membership-popup,
+    [class*="cloud-shoplive"], [class*="csl-"], [class*="svelte-"],
+    .l-cookie-teaser, .c-cookie-settings, .LiveMiniPreview,
+    .c-notification-banner, .c-notification-banner *, .c-notification-banner__wrap,
+    .open-button, .js-video-pause, .js-video-play, [aria-label*="Pausar"], [aria-label*="video"]
+        { display: none !important; visibility: hidden !important; opacity: 0 !important; pointer-events: none !important; }
+
+    /* SPEED: Disable transitions for instant navigation */
+    *, *::before, *::after {
+        transition-duration: 0s !important;
+        animation-duration: 0s !important;
+        transition-delay: 0s !important;
+        animation-delay: 0s !important;
+    }
+
+    /* Sharpness Fixes: Disable smoothing that causes blur during screenshots */
+    .cmp-carousel__item, .c-hero-banner, img {
+        image-rendering: -webkit-optimize-contrast !important;
+        image-rendering: crisp-edges !important;
+        transform: translateZ(0) !important;
+        backface-visibility: hidden !important;
+        perspective: 1000 !important;
+    }
+"""
+
+# Inline styles, so they win over the site's own stylesheets; each group is one combined selector,
+# i.e. a single querySelectorAll per group inside HIDE_JS
+HIDDEN_ELEMENTS = ", ".join(['.c-header', '.navigation', '.iw_viewport-wrapper > header', '.al-quick-btn__quickbtn',
+                             '.al-quick-btn__topbtn'])
+TRANSPARENT_ELEMENTS = ", ".join(['.cmp-carousel__indicators', '.cmp-carousel__actions', '.c-carousel-controls'])
+
+HIDE_JS = f"""
+    document.querySelectorAll('.c-notification-banner').forEach(el => el.remove());
+
+    document.querySelectorAll({json.dumps(HIDDEN_ELEMENTS)})
+        .forEach(el => el.style.setProperty('display', 'none', 'important'));
+
+    document.querySelectorAll({json.dumps(TRANSPARENT_ELEMENTS)})
+        .forEach(el => el.style.setProperty('opacity', '0', 'important'));
+
+    // Pause videos immediately to prevent motion blur
+    document.querySelectorAll('video').forEach(v => v.pause());
+"""
+
+# Context init script: stop Swiper autoplay as soon as an instance is attached, before the site's own
+# scripts can advance slides underneath us
+SWIPER_INIT_JS = """
+    Object.defineProperty(HTMLElement.prototype, 'swiper', {
+        configurable: true,
+        get() { return undefined; },
+        set(instance) {
+            Object.defineProperty(this, 'swiper', { value: instance, writable: true, configurable: true });
+            try {
+                instance.params.speed = 0;
+                instance.on('autoplayStart', () => setTimeout(() => instance.autoplay.stop()));
+            } catch (e) {}
+        }
+    });
+"""
+
+# Run on the hero carousel element. Does the whole per-slide preparation in one round trip: re-clean the page,
+# force the swiper to slide idx (re-navigating once if its realIndex doesn't follow), wait for the active
+# image to decode, then tag the element to capture with data-capture-target.
+PREPARE_SLIDE_JS = """
+    async (car, [idx, navTimeout, imageTimeout]) => {
+        const sleep = ms => new Promise(resolve => setTimeout(resolve, ms));
+
+        const goToSlide = () => {
+            document.querySelectorAll('.c-notification-banner').forEach(el => el.remove());
+            document.querySelectorAll('video').forEach(v => v.pause());
+
+            if (car.swiper) {
+                if (car.swiper.autoplay) car.swiper.autoplay.stop();
+                // Force zero speed for instant jump to avoid animation blur
+                car.swiper.params.speed = 0;
+                if (typeof car.swiper.slideToLoop === 'function') {
+                    car.swiper.slideToLoop(idx);
+                } else {
+                    car.swiper.slideTo(idx);
+                }
+            } else {
+                const inds = car.querySelectorAll('.cmp-carousel__indicator');
+                if (inds[idx]) inds[idx].click();
             }
+        };
+
+        const isActive = () => car.swiper
+            ? car.swiper.realIndex === idx
+            : !!car.querySelector(`.swiper-slide-active[data-swiper-slide-index="${idx}"]`);
 
-            /* Sharpness Fixes: Disable smoothing that causes blur during screenshots */
-            .cmp-carousel__item, .c-hero-banner, img {
-                image-rendering: -webkit-optimize-contrast !important;
-                image-rendering: crisp-edges !important;
-                transform: translateZ(0) !important;
-                backface-visibility: hidden !important;
-                perspective: 1000 !important;
+        const waitActive = async () => {
+            const deadline = performance.now() + navTimeout;
+            while (!isActive()) {
+                if (performance.now() > deadline) return false;
+                await sleep(16);
             }
-        `;
-        document.head.appendChild(style);
+            return true;
+        };
+
+        // Autoplay is stopped by the init script, so one re-navigation on timeout suffices
+        goToSlide();
+        let retried = false;
+        if (!(await waitActive())) {
+            retried = true;
+            goToSlide();
+            await waitActive();
+        }
 
-        const hideSelectors = ['.c-header', '.navigation', '.iw_viewport-wrapper > header', '.al-quick-btn__quickbtn', '.al-quick-btn__topbtn'];
-        hideSelectors.forEach(s => {
-            document.querySelectorAll(s).forEach(el => el.style.setProperty('display', 'none', 'important'));
-        });
+        document.querySelectorAll('[data-capture-target]').forEach(el => el.removeAttribute('data-capture-target'));
+        // Scoped to the hero: a page-wide lookup could tag the active slide of another (even hidden) carousel
+        const slide = car.querySelector(`.cmp-carousel__item.swiper-slide-active[data-swiper-slide-index='${idx}']`)
+            || car.querySelector('.cmp-carousel__item.swiper-slide-active');
+        if (!slide) return { retried, found: false };
+
+        // Late-loading hero image: load it eagerly and wait for the decode instead of guessing with sleeps
+        const img = slide.querySelector('img');
+        if (img) {
+            img.loading = 'eager';
+            await Promise.race([img.decode().catch(() => {}), sleep(imageTimeout)]);
+        }
 
-        const opacitySelectors = ['.cmp-carousel__indicators', '.cmp-carousel__actions', '.c-carousel-controls'];
-        opacitySelectors.forEach(s => {
-            document.querySelectorAll(s).forEach(el => el.style.setProperty('opacity', '0', 'important'));
-        });
+        const target = slide.querySelector('.c-hero-banner') || slide.querySelector('.cmp-image') || slide;
+        target.setAttribute('data-capture-target', '');
+        return { retried, found: true };
+    }
+"""
 
-        // Pause videos immediately to prevent motion blur
-        document.querySelectorAll('video').forEach(v => v.pause());
-    """)
+
+def apply_clean_styles(page_obj):
+    """Comprehensive CSS cleanup with Sharpening and Speed fixes. Run once per page, not per slide."""
+    page_obj.add_style_tag(content=CLEAN_CSS)
+    page_obj.evaluate(HIDE_JS)
+
+
+# Carousels inside these wrappers are never the hero
+EXCLUDED_WRAPPERS = ".c-notification-banner, .l-cookie-teaser, .c-membership-popup"
+
+# Carousel text that marks a notification/legal strip rather than the hero, matched in a single scan
+NOTIFICATION_KEYWORDS = [
+    'cookie', 'クッキー', 'プライバシー', 'privacy', 'notice',
+    'お知らせ', '利用規約', '特定商取引', 'オンラインショップ',
+    'terms', 'conditions', '規約', '改正'
+]
+NOTIFICATION_RE = re.compile("|".join(map(re.escape, NOTIFICATION_KEYWORDS)), re.IGNORECASE)
+
+# Everything find_hero_carousel needs about each .cmp-carousel, gathered in a single evaluate
+CAROUSEL_METRICS_JS = """
+    ([heroSelectors, excludedWrappers]) => Array.from(document.querySelectorAll('.cmp-carousel')).map((el, index) => {
+        const r = el.getBoundingClientRect();
+        return {
+            index,
+            y: r.y,
+            width: r.width,
+            height: r.height,
+            matches: heroSelectors.filter(s => el.matches(s)),
+            excluded: !!el.closest(excludedWrappers),
+            indicators: el.querySelectorAll('.cmp-carousel__indicator').length,
+            has_hero_banner: !!el.querySelector('.c-hero-banner'),
+            has_hero_image: !!el.querySelector('.c-image__item, .cmp-image'),
+            text: el.innerText || ''
+        };
+    })
+"""
 
 
 def find_hero_carousel(page, log_callback=None):
@@ -277,7 +793,7 @@ def find_hero_carousel(page, log_callback=None):
 
     log("🔍 Detecting hero carousel...")
 
-    excluded_wrappers = ".c-notification-banner, .l-cookie-teaser, .c-membership-popup"
+    excluded_wrappers = EXCLUDED_WRAPPERS
 
     hero_selectors = [
         "main .cmp-carousel",
@@ -289,131 +805,221 @@ def find_hero_carousel(page, log_callback=None):
         "section .cmp-carousel",
     ]
 
-    hero_carousel = None
-    for selector in hero_selectors:
-        try:
-            elements = page.query_selector_all(selector)
-            for element in elements:
-                is_in_excluded = element.evaluate(f"el => !!el.closest('{excluded_wrappers}')")
-                if is_in_excluded:
-                    continue
+    # One CDP round-trip: measure every carousel in the browser and score in Python
+    try:
+        carousels = page.evaluate(CAROUSEL_METRICS_JS, [hero_selectors, excluded_wrappers])
+    except Exception as e:
+        log(f"❌ Error in carousel detection: {str(e)}")
+        return None
 
-                indicators = element.query_selector_all(".cmp-carousel__indicator")
-                if len(indicators) > 0:
-                    bbox = element.bounding_box()
-                    if bbox and bbox['height'] >= 300:
-                        log(f"✅ Found hero carousel using: {selector}")
-                        hero_carousel = element
-                        break
-            if hero_carousel:
+    hero_index = None
+    for selector in hero_selectors:
+        for c in carousels:
+            if selector in c['matches'] and not c['excluded'] and c['indicators'] > 0 and c['height'] >= 300:
+                log(f"✅ Found hero carousel using: {selector}")
+                hero_index = c['index']
                 break
-        except Exception:
-            continue
+        if hero_index is not None:
+            break
 
-    if not hero_carousel:
+    if hero_index is None:
         log("⚠️ Could not find hero carousel with specific selectors, using advanced scoring...")
-        try:
-            all_carousels = page.query_selector_all(".cmp-carousel")
-            candidates = []
-            viewport_size = page.viewport_size
-            viewport_width = viewport_size['width'] if viewport_size else 1280
-
-            for idx, carousel in enumerate(all_carousels):
-                is_in_excluded = carousel.evaluate(f"el => !!el.closest('{excluded_wrappers}')")
-                if is_in_excluded:
-                    log(f"   Carousel {idx}: SKIPPED (inside {excluded_wrappers})")
-                    continue
+        candidates = []
+        viewport_size = page.viewport_size
+        viewport_width = viewport_size['width'] if viewport_size else 1280
+
+        for c in carousels:
+            idx = c['index']
+            if c['excluded']:
+                log(f"   Carousel {idx}: SKIPPED (inside {excluded_wrappers})")
+                continue
+
+            if c['indicators'] == 0:
+                continue
+
+            if c['width'] == 0 and c['height'] == 0:
+                continue
+
+            if c['height'] < 200:
+                log(f"   Carousel {idx}: SKIPPED (too short: {c['height']:.0f}px)")
+                continue
+
+            if c['width'] < viewport_width * 0.5:
+                log(f"   Carousel {idx}: SKIPPED (too narrow: {c['width']:.0f}px)")
+                continue
+
+            has_hero_banner = c['has_hero_banner']
+            has_hero_image = c['has_hero_image']
+
+            if NOTIFICATION_RE.search(c['text']):
+                log(f"   Carousel {idx}: SKIPPED (notification/legal content detected)")
+                continue
+
+            score = 0
+            if has_hero_banner:
+                score += 100
+            if has_hero_image:
+                score += 50
+
+            area = c['width'] * c['height']
+            if area > 500000:
+                score += 30
+
+            if c['height'] > 400:
+                score += 50
+            elif c['height'] > 300:
+                score += 30
+            elif c['height'] > 200:
+                score += 10
+
+            if 100 < c['y'] < 600:
+                score += 25
+            elif 50 < c['y'] < 100:
+                score -= 20
+            elif c['y'] < 50:
+                score -= 100
+
+            if c['width'] > viewport_width * 0.9:
+                score += 20
+            elif c['width'] > viewport_width * 0.8:
+                score += 15
+
+            candidates.append({
+                'score': score,
+                'position': c['y'],
+                'height': c['height'],
+                'size': area,
+                'has_hero': has_hero_banner,
+                'index': idx
+            })
+
+            log(f"   Carousel {idx}: score={score}, pos={c['y']:.0f}px, height={c['height']:.0f}px, size={area:.0f}, hero={has_hero_banner}")
+
+        if candidates:
+            candidates.sort(key=lambda x: x['score'], reverse=True)
+            best = candidates[0]
+
+            if best['score'] > 0:
+                hero_index = best['index']
+                log(f"✅ Selected carousel {best['index']} (score: {best['score']})")
+            else:
+                log(f"❌ No suitable carousel found (best score: {best['score']})")
 
-                indicators = carousel.query_selector_all(".cmp-carousel__indicator")
-                if len(indicators) == 0:
-                    continue
+    if hero_index is None:
+        return None
 
-                bbox = carousel.bounding_box()
-                if not bbox:
-                    continue
+    # Second and last round-trip: fetch the winning element by its document index
+    return page.evaluate_handle("idx => document.querySelectorAll('.cmp-carousel')[idx]", hero_index).as_element()
 
-                if bbox['height'] < 200:
-                    log(f"   Carousel {idx}: SKIPPED (too short: {bbox['height']:.0f}px)")
-                    continue
 
-                if bbox['width'] < viewport_width * 0.5:
-                    log(f"   Carousel {idx}: SKIPPED (too narrow: {bbox['width']:.0f}px)")
-                    continue
+# Winning hero selector per (country, mode), tried before the full detection on the next capture
+HERO_SELECTOR_CACHE = Path.home() / ".cache" / "lg_hero_selectors.json"
+# Entries older than this are re-detected, so a page redesign can't pin a stale but still valid carousel
+HERO_SELECTOR_MAX_AGE = 7 * 24 * 3600
 
-                has_hero_banner = carousel.query_selector(".c-hero-banner") is not None
-                has_hero_image = carousel.query_selector(".c-image__item, .cmp-image") is not None
+# Structural CSS path (tag:nth-of-type chain from <body>) that re-finds the same element on the next load
+CSS_PATH_JS = """
+    (el) => {
+        const parts = [];
+        for (let node = el; node && node !== document.body; node = node.parentElement) {
+            let nth = 1;
+            for (let sib = node.previousElementSibling; sib; sib = sib.previousElementSibling) {
+                if (sib.tagName === node.tagName) nth++;
+            }
+            parts.unshift(`${node.tagName.toLowerCase()}:nth-of-type(${nth})`);
+        }
+        return ['body', ...parts].join(' > ');
+    }
+"""
 
-                try:
-                    carousel_text = carousel.inner_text().lower()
-                    notification_keywords = [
-                        'cookie', 'クッキー', 'プライバシー', 'privacy', 'notice',
-                        'お知らせ', '利用規約', '特定商取引', 'オンラインショップ',
-                        'terms', 'conditions', '規約', '改正'
-                    ]
-                    if any(keyword in carousel_text for keyword in notification_keywords):
-                        log(f"   Carousel {idx}: SKIPPED (notification/legal content detected)")
-                        continue
-                except:
-                    pass
-
-                score = 0
-                if has_hero_banner:
-                    score += 100
-                if has_hero_image:
-                    score += 50
-
-                area = bbox['width'] * bbox['height']
-                if area > 500000:
-                    score += 30
-
-                if bbox['height'] > 400:
-                    score += 50
-                elif bbox['height'] > 300:
-                    score += 30
-                elif bbox['height'] > 200:
-                    score += 10
-
-                if 100 < bbox['y'] < 600:
-                    score += 25
-                elif 50 < bbox['y'] < 100:
-                    score -= 20
-                elif bbox['y'] < 50:
-                    score -= 100
-
-                if bbox['width'] > viewport_width * 0.9:
-                    score += 20
-                elif bbox['width'] > viewport_width * 0.8:
-                    score += 15
-
-                candidates.append({
-                    'carousel': carousel,
-                    'score': score,
-                    'position': bbox['y'],
-                    'height': bbox['height'],
-                    'size': area,
-                    'has_hero': has_hero_banner,
-                    'index': idx
-                })
-
-                log(f"   Carousel {idx}: score={score}, pos={bbox['y']:.0f}px, height={bbox['height']:.0f}px, size={area:.0f}, hero={has_hero_banner}")
-
-            if candidates:
-                candidates.sort(key=lambda x: x['score'], reverse=True)
-                best = candidates[0]
-
-                if best['score'] > 0:
-                    hero_carousel = best['carousel']
-                    log(f"✅ Selected carousel {best['index']} (score: {best['score']})")
-                else:
-                    log(f"❌ No suitable carousel found (best score: {best['score']})")
+# Same acceptance rules as the detection's preferred-selector pass
+CACHED_HERO_VALID_JS = """
+    (el, excludedWrappers) => el.matches('.cmp-carousel')
+        && !el.closest(excludedWrappers)
+        && el.querySelectorAll('.cmp-carousel__indicator').length > 0
+        && el.getBoundingClientRect().height >= 300
+"""
 
-        except Exception as e:
-            log(f"❌ Error in advanced detection: {str(e)}")
 
+@st.cache_resource
+def _hero_selector_lock():
+    return threading.Lock()
+
+
+def _load_hero_selectors():
+    try:
+        with open(HERO_SELECTOR_CACHE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_hero_selector(key, selector):
+    # Capture workers run in parallel, so serialize the read-modify-write of the cache file
+    with _hero_selector_lock():
+        selectors = _load_hero_selectors()
+        selectors[key] = {"selector": selector, "saved_at": time.time()}
+        HERO_SELECTOR_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        with open(HERO_SELECTOR_CACHE, 'w', encoding='utf-8') as f:
+            json.dump(selectors, f, indent=2)
+
+
+def locate_hero_carousel(page, country_code, mode, log_callback=None):
+    """Try the selector cached for this country/mode first; fall back to full detection and cache the winner."""
+    key = f"{country_code}_{mode}"
+    entry = _load_hero_selectors().get(key)
+    cached_selector = None
+    if isinstance(entry, dict) and time.time() - entry.get("saved_at", 0) < HERO_SELECTOR_MAX_AGE:
+        cached_selector = entry.get("selector")
+
+    if cached_selector:
+        element = page.query_selector(cached_selector)
+        if element and element.evaluate(CACHED_HERO_VALID_JS, EXCLUDED_WRAPPERS):
+            if log_callback:
+                log_callback("♻️ Using cached hero carousel selector")
+            return element
+
+    hero_carousel = find_hero_carousel(page, log_callback)
+    if hero_carousel:
+        _save_hero_selector(key, hero_carousel.evaluate(CSS_PATH_JS))
     return hero_carousel
 
 
-def capture_hero_banners(url, country_code, mode='desktop', log_callback=None, upload_to_cloud=False):
+def image_signature(data):
+    """Fast non-cryptographic fingerprint of the rendered image bytes, used to spot duplicate slides."""
+    if xxhash is not None:
+        return xxhash.xxh3_64(data).hexdigest()
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+def shoot_slide(page, hero_carousel, i, log):
+    """Navigate the hero carousel to slide i, wait until it is ready and return its JPEG bytes (None if not found)."""
+    # 1./2. Navigate, wait on realIndex and on the active image's decode, all inside the page
+    state = hero_carousel.evaluate(PREPARE_SLIDE_JS, [i, 1500, 3000])
+    if state['retried']:
+        log(f"   ⚠️ Swiper active index mismatch. Retried once.")
+    if not state['found']:
+        return None
+
+    # 3. Other late-loading assets: returns immediately once the page has been network idle
+    try:
+        page.wait_for_load_state('networkidle', timeout=2000)
+    except PlaywrightTimeoutError:
+        pass
+
+    # 4. Capture Logic
+    element = page.query_selector("[data-capture-target]")
+    if not element:
+        return None
+
+    # The screenshot scrolls the element into view itself
+    # Use scale='device' for the screenshot to respect our DPR 2.0
+    # SPEED FIX: Save as JPEG to reduce file size and encoding time. Chromium encodes with
+    # libjpeg-turbo already, so we keep its encoder and just take the bytes in memory.
+    return element.screenshot(scale="device", type="jpeg", quality=95)
+
+
+def capture_hero_banners(url, country_code, mode='desktop', log_callback=None, upload_to_cloud=False, save_local=False):
     def log(message):
         if log_callback:
             log_callback(message)
@@ -421,55 +1027,49 @@ def capture_hero_banners(url, country_code, mode='desktop', log_callback=None, u
     # Resolution Boost: We set a high device_pixel_ratio to avoid blurriness
     size: ViewportSize = {'width': 1920, 'height': 720} if mode == 'desktop' else {'width': 360, 'height': 480}
 
-    session_folder_name = f"{country_code}_{mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    session_path = os.path.join(UPLOAD_FOLDER, session_folder_name)
-    os.makedirs(session_path, exist_ok=True)
-
-    with sync_playwright() as p:
-        log("🚀 Launching browser...")
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                "--no-sandbox",
-                "--disable-setuid-sandbox",
-                "--disable-dev-shm-usage",
-                "--disable-gpu"
-            ]
-        )
+    # One timestamp for the whole capture, shared by the local folder name and every slide's public_id
+    capture_stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+
+    # Captures live in memory; a dated folder under UPLOAD_FOLDER is only written when asked for
+    session_path = None
+    if save_local:
+        session_folder_name = f"{country_code}_{mode}_{capture_stamp}"
+        session_path = os.path.join(UPLOAD_FOLDER, session_folder_name)
+        os.makedirs(session_path, exist_ok=True)
 
-        # USE DPR 2.0 FOR SHARPER CAPTURES
-        context = browser.new_context(viewport=size, device_scale_factor=2)
+    # Reuse the warm browser; only the context is created per capture
+    _, browser = get_browser()
+
+    # USE DPR 2.0 FOR SHARPER CAPTURES
+    # The context is closed on exit; the browser itself stays warm for the next capture
+    with browser.new_context(viewport=size, device_scale_factor=2) as context:
+        context.add_init_script(SWIPER_INIT_JS)
         page = context.new_page()
 
-        def block_chat_requests(route):
-            url_str = route.request.url.lower()
-            chat_keywords = ["genesys", "liveperson", "salesforceliveagent", "adobe-privacy", "chatbot",
-                             "proactive-chat"]
-            if any(key in url_str for key in chat_keywords):
+        def block_heavy_requests(route):
+            request = route.request
+            if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_RE.search(request.url):
                 route.abort()
             else:
                 route.continue_()
 
-        page.route("**/*", block_chat_requests)
+        page.route("**/*", block_heavy_requests)
+
+        slides_captured = 0
+        navigated = False
 
         try:
             log(f"🌐 Navigating to {url}...")
             # SPEED FIX: Use domcontentloaded for faster start
             page.goto(url, wait_until="domcontentloaded", timeout=90000)
+            navigated = True
 
-            try:
-                accept_btn = page.locator("#onetrust-accept-btn-handler")
-                if accept_btn.is_visible(timeout=5000):
-                    log("🍪 Accepting cookies...")
-                    accept_btn.click()
-                    # Shortened wait after cookie acceptance
-                    time.sleep(0.5)
-            except:
-                pass
+            # No consent handling: the OneTrust SDK is blocked at the network layer and its container is
+            # hidden by CLEAN_CSS, so there is never a banner to accept
 
             page.wait_for_selector("main .cmp-carousel, .main .cmp-carousel, #contents .cmp-carousel", timeout=30000)
 
-            hero_carousel = find_hero_carousel(page, log_callback)
+            hero_carousel = locate_hero_carousel(page, country_code, mode, log_callback)
 
             if not hero_carousel:
                 log("❌ Could not identify hero carousel")
@@ -479,131 +1079,125 @@ def capture_hero_banners(url, country_code, mode='desktop', log_callback=None, u
             num_slides = len(indicators)
             log(f"📸 Found {num_slides} indicators in carousel.")
 
-            # TRACKER: To prevent capturing the same banner twice
-            captured_signatures = []
+            # Inject the cleanup stylesheet once (after detection, since hiding the header shifts positions)
+            apply_clean_styles(page)
+
+            # TRACKER: Hashes of the captured images, to prevent capturing the same banner twice
+            captured_hashes = set()
 
             for i in range(num_slides):
                 slide_num = i + 1
-                success = False
-
-                # ATTEMPT LOOP: Handles mobile snapping/duplicates
-                for attempt in range(4):  # Increased to 4 attempts for tricky sites
-                    log(f"   Capturing slide {slide_num} (Attempt {attempt + 1})...")
-
-                    # 1. Force the swiper state & stop autoplay via JS
-                    page.evaluate(f"""
-                        (idx) => {{
-                            const car = document.querySelector('.cmp-carousel');
-                            if (car && car.swiper) {{
-                                car.swiper.autoplay.stop();
-                                // Force zero speed for instant jump to avoid animation blur
-                                car.swiper.params.speed = 0;
-                                if (typeof car.swiper.slideToLoop === 'function') {{
-                                    car.swiper.slideToLoop(idx);
-                                }} else {{
-                                    car.swiper.slideTo(idx);
-                                }}
-                            }} else {{
-                                const inds = document.querySelectorAll('.cmp-carousel__indicator');
-                                if (inds[idx]) inds[idx].click();
-                            }}
-                        }}
-                    """, i)
-
-                    # 2. Hard wait for visual stability (Reduced to 1s because transitions are disabled)
-                    time.sleep(1.0)
-
-                    # 3. Apply styles for clean capture
-                    apply_clean_styles(page)
-
-                    # 4. Detect "Current Slide Signature" to verify uniqueness
-                    signature_data = page.evaluate(f"""
-                        (targetIdx) => {{
-                            const active = document.querySelector(`.swiper-slide-active[data-swiper-slide-index="${{targetIdx}}"]`) 
-                                           || document.querySelector('.swiper-slide-active');
-
-                            if (!active) return {{ sig: "null", match: false }};
-
-                            const img = active.querySelector('img');
-                            const text = active.innerText.trim().substring(0, 80);
-                            const currentIdx = active.getAttribute('data-swiper-slide-index');
-
-                            // FORCE A REFLOW to fix sub-pixel blur before return
-                            active.offsetHeight; 
-
-                            return {{
-                                sig: (img ? img.src : 'no-img') + "|" + text,
-                                match: currentIdx == targetIdx
-                            }};
-                        }}
-                    """, i)
-
-                    current_sig = signature_data['sig']
-                    is_correct_index = signature_data['match']
-
-                    if current_sig in captured_signatures and attempt < 3:
-                        log(f"   ⚠️ Duplicate detected. Retrying navigation...")
-                        time.sleep(0.5)
-                        continue
+                log(f"   Capturing slide {slide_num}...")
+
+                jpg_bytes = shoot_slide(page, hero_carousel, i, log)
+                sig = image_signature(jpg_bytes) if jpg_bytes else None
 
-                    if not is_correct_index and attempt < 3:
-                        log(f"   ⚠️ Swiper active index mismatch. Retrying...")
-                        time.sleep(0.5)
+                if sig in captured_hashes:
+                    log(f"   ⚠️ Duplicate detected. Retrying navigation...")
+                    jpg_bytes = shoot_slide(page, hero_carousel, i, log)
+                    sig = image_signature(jpg_bytes) if jpg_bytes else None
+                    if sig in captured_hashes:
+                        log(f"   ❌ Slide {slide_num} is identical to an earlier capture. Skipping.")
                         continue
 
-                    # 5. Capture Logic
-                    active_slide_selector = f".cmp-carousel__item.swiper-slide-active[data-swiper-slide-index='{i}']"
-                    try:
-                        page.wait_for_selector(active_slide_selector, timeout=2000)
-                    except:
-                        active_slide_selector = ".cmp-carousel__item.swiper-slide-active"
-
-                    # SPEED FIX: Use JPEG instead of PNG for faster processing
-                    filename = f"{country_code}_{mode}_hero_{slide_num}.jpg"
-                    filepath = os.path.join(session_path, filename)
-
-                    element = None
-                    banner_selectors = [
-                        f"{active_slide_selector} .c-hero-banner",
-                        f"{active_slide_selector} .cmp-image",
-                        active_slide_selector
-                    ]
-
-                    for selector in banner_selectors:
-                        element = page.query_selector(selector)
-                        if element: break
-
-                    if element:
-                        element.scroll_into_view_if_needed()
-                        # Shortened wait for settling
-                        time.sleep(0.2)
-
-                        # Use scale='device' for the screenshot to respect our DPR 2.0
-                        # SPEED FIX: Save as JPEG to reduce file size and encoding time
-                        element.screenshot(path=filepath, scale="device", type="jpeg", quality=95)
-                        captured_signatures.append(current_sig)
-                        log(f"✅ Captured: {filename}")
-
-                        cloudinary_url = None
-                        cloudinary_id = None
-
-                        if upload_to_cloud:
-                            log(f"☁️ Uploading to Cloud...")
-                            cloudinary_url, cloudinary_id = upload_to_cloudinary(filepath, country_code, mode,
-                                                                                 slide_num)
-
-                        yield filepath, slide_num, cloudinary_url
-                        success = True
-                        break
+                if not jpg_bytes:
+                    log(f"   ❌ Failed to capture slide {slide_num}: no banner element found")
+                    continue
+
+                captured_hashes.add(sig)
 
-                if not success:
-                    log(f"   ❌ Failed to capture unique version of slide {slide_num} after 4 attempts")
+                # SPEED FIX: Use JPEG instead of PNG for faster processing
+                filename = f"{country_code}_{mode}_hero_{slide_num}.jpg"
+                if session_path:
+                    with open(os.path.join(session_path, filename), 'wb') as f:
+                        f.write(jpg_bytes)
+                log(f"✅ Captured: {filename}")
 
+                upload_future = None
+
+                if upload_to_cloud:
+                    log(f"☁️ Uploading to Cloud...")
+                    # Runs in the background; the caller resolves the (url, public_id) future
+                    upload_future = submit_with_ctx(_upload_executor(), upload_to_cloudinary, jpg_bytes, filename,
+                                                    country_code, mode, slide_num, capture_stamp)
+
+                slides_captured += 1
+                # Previews, the ZIP and the upload all work from the bytes, never from disk
+                yield jpg_bytes, filename, slide_num, upload_future
+
+        except PlaywrightError as e:
+            # Nothing captured yet and the page never loaded, or Chromium went away: let the caller retry the
+            # whole site. Anything after a good navigation (e.g. no carousel on the page) would fail again.
+            if not slides_captured and (not navigated or not browser.is_connected()):
+                raise
+            log(f"❌ Error: {str(e)}")
         except Exception as e:
             log(f"❌ Error: {str(e)}")
         finally:
-            log("🔒 Closing browser.")
-            browser.close()
+            log("🔒 Closing browser context.")
+
+
+# --- SUBSIDIARIES ---
+
+# Regional Groups Definition
+REGIONS = {
+    "Asia": [
+        ("au", "Australia (AU)"), ("jp", "Japan (JP)"), ("hk", "Hong Kong (HK)"), ("tw", "Taiwan (TW)"),
+        ("in", "India (IN)"), ("sg", "Singapore (SG)"), ("my", "Malaysia (MY)"),
+        ("th", "Thailand (TH)"), ("vn", "Vietnam (VN)"), ("ph", "Philippines (PH)"),
+        ("id", "Indonesia (ID)")
+    ],
+    "Europe": [
+        ("uk", "United Kingdom (UK)"), ("ch_fr", "Switzerland (CH_FR)"), ("ch_de", "Switzerland (CH_DE)"),
+        ("fr", "France (FR)"), ("de", "Germany (DE)"), ("it", "Italy (IT)"),
+        ("es", "Spain (ES)"), ("nl", "Netherlands (NL)"), ("cz", "Czech Republic (CZ)"),
+        ("se", "Sweden (SE)"), ("pt", "Portugal (PT)"), ("hu", "Hungary (HU)"),
+        ("pl", "Poland (PL)"), ("at", "Austria (AT)")
+    ],
+    "LATAM": [
+        ("mx", "Mexico (MX)"), ("br", "Brazil (BR)"), ("ar", "Argentina (AR)"), ("cl", "Chile (CL)"),
+        ("co", "Colombia (CO)"), ("pe", "Peru (PE)"), ("pa", "Panama (PA)")
+    ],
+    "MEA": [
+        ("kz", "Kazakhstan (KZ)"), ("tr", "Turkiye (TR)"), ("eg_en", "Egypt (EG_EN)"), ("eg_ar", "Egypt (EG_AR)"),
+        ("ma", "Morocco (MA)"), ("sa_en", "Saudi Arabia (SA_EN)"), ("sa", "Saudi Arabia (SA)"), 
+        ("za", "South Africa (ZA)")
+    ],
+    "Canada": [
+        ("ca_en", "Canada (CA_EN)"), ("ca_fr", "Canada (CA_FR)")
+    ]
+}
+
+
+# cache_resource rather than cache_data: the tables are read-only, so every rerun can share them uncopied
+@st.cache_resource
+def load_subsidiary_config():
+    """Flat subsidiary list, label -> code lookup and dropdown options, derived from REGIONS once per process."""
+    all_subs = [site for r_list in REGIONS.values() for site in r_list]
+
+    # Dropdown label -> country code, so a country selection is a dict lookup
+    label_to_code = {label: code for code, label in all_subs}
+
+    # Build Dropdown Options
+    # Options will be: Region Name, All Subsidiaries, or Individual Country Name
+    country_labels = ["All Subsidiaries", "Asia", "Europe", "LATAM", "MEA", "Canada"]
+
+    # Add individual countries (sorted)
+    individual_sorted = sorted(all_subs, key=lambda x: x[1])
+    country_labels.extend([label for _, label in individual_sorted])
+
+    return all_subs, label_to_code, country_labels
+
+
+def build_capture_queue(selected_option):
+    """(code, label) pairs to capture for a dropdown selection; shared tables are returned as-is, never copied."""
+    all_subs, label_to_code, _ = load_subsidiary_config()
+    if selected_option == "All Subsidiaries":
+        return all_subs
+    if selected_option in REGIONS:
+        return REGIONS[selected_option]
+    # It's an individual country
+    return [(label_to_code[selected_option], selected_option)]
 
 
 # --- STREAMLIT UI ---
@@ -611,6 +1205,9 @@ def capture_hero_banners(url, country_code, mode='desktop', log_callback=None, u
 def main():
     st.title("LG Hero Banner Capture")
 
+    # Returns immediately; browsers finish launching while the user picks a country
+    prewarm_capture_pool()
+
     with st.expander("⚙️ Configuration Status", expanded=False):
         cloudinary_configured = all([CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET])
         airtable_configured = all([AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME])
@@ -618,7 +1215,7 @@ def main():
         st.write("**Airtable:**", "✅ Configured" if airtable_configured else "❌ Not configured")
 
     if 'log_messages' not in st.session_state:
-        st.session_state.log_messages = []
+        st.session_state.log_messages = deque(maxlen=LOG_MAX_LINES)
         
     if 'stop_requested' not in st.session_state:
         st.session_state.stop_requested = False
@@ -627,82 +1224,22 @@ def main():
         st.header("Settings")
         if st.button("🔍 Test Airtable Connection"):
             try:
-                import requests
-                # 1. READ TEST
-                read_url = f"https://api.airtable.com/v0/{AIRTABLE_BASE_ID}/{AIRTABLE_TABLE_NAME}"
-                headers = {"Authorization": f"Bearer {AIRTABLE_API_KEY}"}
-                read_response = requests.get(read_url, headers=headers, verify=False)
-
-                if read_response.status_code == 200:
-                    st.success("✅ READ access works!")
-
-                    # 2. WRITE TEST (Functional check without the info text)
-                    write_data = {
-                        "fields": {
-                            "country": "Australia",
-                            "period": datetime.now().strftime('%m/%d/%Y'),
-                            "banner-type": "hero-banner-pc",
-                        }
-                    }
-                    write_response = requests.post(read_url, json=write_data, headers=headers, verify=False)
-
-                    if write_response.status_code == 200:
-                        st.success("✅ WRITE access works!")
-                        # Cleanup test record
-                        record_id = write_response.json().get('id')
-                        requests.delete(f"{read_url}/{record_id}", headers=headers, verify=False)
-                    else:
-                        st.error(f"❌ WRITE failed: {write_response.text}")
-                else:
-                    st.error(f"❌ READ failed: {read_response.text}")
+                # Cached probes: repeat clicks within 5 minutes skip the round-trips after a success
+                _probe_airtable_read(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+                st.success("✅ READ access works!")
+                _probe_airtable_write(AIRTABLE_BASE_ID, AIRTABLE_TABLE_NAME)
+                st.success("✅ WRITE access works!")
             except Exception as e:
-                st.error(f"❌ Test failed: {str(e)}")
+                st.error(f"❌ {str(e)}")
 
         st.divider()
 
-        # Regional Groups Definition
-        regions = {
-            "Asia": [
-                ("au", "Australia (AU)"), ("jp", "Japan (JP)"), ("hk", "Hong Kong (HK)"), ("tw", "Taiwan (TW)"),
-                ("in", "India (IN)"), ("sg", "Singapore (SG)"), ("my", "Malaysia (MY)"),
-                ("th", "Thailand (TH)"), ("vn", "Vietnam (VN)"), ("ph", "Philippines (PH)"),
-                ("id", "Indonesia (ID)")
-            ],
-            "Europe": [
-                ("uk", "United Kingdom (UK)"), ("ch_fr", "Switzerland (CH_FR)"), ("ch_de", "Switzerland (CH_DE)"),
-                ("fr", "France (FR)"), ("de", "Germany (DE)"), ("it", "Italy (IT)"),
-                ("es", "Spain (ES)"), ("nl", "Netherlands (NL)"), ("cz", "Czech Republic (CZ)"),
-                ("se", "Sweden (SE)"), ("pt", "Portugal (PT)"), ("hu", "Hungary (HU)"),
-                ("pl", "Poland (PL)"), ("at", "Austria (AT)")
-            ],
-            "LATAM": [
-                ("mx", "Mexico (MX)"), ("br", "Brazil (BR)"), ("ar", "Argentina (AR)"), ("cl", "Chile (CL)"),
-                ("co", "Colombia (CO)"), ("pe", "Peru (PE)"), ("pa", "Panama (PA)")
-            ],
-            "MEA": [
-                ("kz", "Kazakhstan (KZ)"), ("tr", "Turkiye (TR)"), ("eg_en", "Egypt (EG_EN)"), ("eg_ar", "Egypt (EG_AR)"),
-                ("ma", "Morocco (MA)"), ("sa_en", "Saudi Arabia (SA_EN)"), ("sa", "Saudi Arabia (SA)"), 
-                ("za", "South Africa (ZA)")
-            ],
-            "Canada": [
-                ("ca_en", "Canada (CA_EN)"), ("ca_fr", "Canada (CA_FR)")
-            ]
-        }
-        
-        all_subs = []
-        for r_list in regions.values():
-            all_subs.extend(r_list)
-
-        # Build Dropdown Options
-        # Options will be: Region Name, All Subsidiaries, or Individual Country Name
-        country_labels = ["All Subsidiaries", "Asia", "Europe", "LATAM", "MEA", "Canada"]
-        
-        # Add individual countries (sorted)
-        individual_sorted = sorted(all_subs, key=lambda x: x[1])
-        country_labels.extend([label for _, label in individual_sorted])
+        _, _, country_labels = load_subsidiary_config()
 
         selected_option = st.selectbox("Subsidiary/Region", options=country_labels, index=0) # Default to All Subsidiaries
         mode = st.selectbox("View Mode", options=["desktop", "mobile"])
+        save_local = st.checkbox("💾 Save local copies", value=False,
+                                 help=f"Also write every capture to {UPLOAD_FOLDER}")
 
         st.divider()
         st.subheader("☁️ Airtable Upload")
@@ -722,31 +1259,30 @@ def main():
         st.subheader("Activity Log")
         log_placeholder = st.empty()
 
+    # SPEED FIX: Every markdown() call ships the whole log to the browser, so redraws are throttled
+    # and a final render_log() catches whatever arrived since the last one
+    log_state = {'last_render': 0.0}
+
+    def render_log():
+        log_placeholder.markdown("\n\n".join(reversed(st.session_state.log_messages)))
+        log_state['last_render'] = time.monotonic()
+
     def add_log(message):
-        msg = f"`{datetime.now().strftime('%H:%M:%S')}` {message}"
+        msg = f"`{time.strftime('%H:%M:%S')}` {message}"
+        # The deque drops the oldest line itself once LOG_MAX_LINES is reached
         st.session_state.log_messages.append(msg)
-        
-        # Keep only the last 50 logs to prevent memory/app reset issues
-        if len(st.session_state.log_messages) > 50:
-            st.session_state.log_messages = st.session_state.log_messages[-50:]
-            
-        log_placeholder.markdown("\n\n".join(st.session_state.log_messages[::-1]))
+
+        if time.monotonic() - log_state['last_render'] >= LOG_RENDER_INTERVAL:
+            render_log()
 
     # Logic for Capture
     if run_btn:
-        st.session_state.log_messages = []
+        st.session_state.log_messages = deque(maxlen=LOG_MAX_LINES)
         st.session_state.stop_requested = False
         
-        # Determine the queue based on selection
-        capture_queue = []
-        if selected_option == "All Subsidiaries":
-            capture_queue = all_subs
-        elif selected_option in regions:
-            capture_queue = regions[selected_option]
-        else:
-            # It's an individual country
-            selected_code = next(code for code, label in all_subs if label == selected_option)
-            capture_queue = [(selected_code, selected_option)]
+        capture_queue = build_capture_queue(selected_option)
+        # Airtable period of every record in this run
+        run_period = datetime.now().strftime('%m/%d/%Y')
 
         add_log(f"🏁 Starting capture for **{selected_option}** ({len(capture_queue)} sites) in **{mode}** mode...")
         
@@ -757,66 +1293,173 @@ def main():
             site, label = capture_queue[0]
             country_full_name = label.split(" (")[0]
             url = f"https://www.lg.com/{site}/"
-            captured_files = []
+            captured_count = 0
+            uploads = []
             cloudinary_urls = []
             
             st.subheader(f"Results: {site.upper()} ({mode})")
             cols = st.columns(3)
+
+            # Build the ZIP while capturing; JPEGs are already compressed, so store them without DEFLATE.
+            # It is only opened once a second slide arrives: a single banner is offered as the JPEG itself
+            zip_buffer = io.BytesIO()
+            zf = None
+            first_slide = None
+            # One timestamp for every entry and the archive name, taken once instead of per slide,
+            # so a run that crosses midnight still names the ZIP after the day its entries carry
+            zip_time = time.localtime()
+            zip_date_time = zip_time[:6]
+            zip_stamp = time.strftime('%Y%m%d', zip_time)
+
+            def add_to_zip(name, data):
+                zinfo = zipfile.ZipInfo(name, date_time=zip_date_time)
+                zinfo.compress_type = zipfile.ZIP_STORED
+                zinfo.external_attr = 0o644 << 16  # rw-r--r-- when extracted
+                zf.writestr(zinfo, data)
             
-            for idx, result in enumerate(capture_hero_banners(url, site, mode, log_callback=add_log, upload_to_cloud=upload_enabled)):
-                img_path, slide_num, cloudinary_url = result
-                captured_files.append(img_path)
-                if cloudinary_url:
-                    cloudinary_urls.append(cloudinary_url)
+            # Quiet spells (page load, carousel wait) draw the log lines held back by the redraw throttle
+            for idx, result in enumerate(run_capture(url, site, mode, log_callback=add_log, upload_to_cloud=upload_enabled,
+                                                     save_local=save_local, on_idle=render_log)):
+                img_bytes, img_name, slide_num, upload_future = result
+                captured_count += 1
+                if captured_count == 1:
+                    first_slide = (img_name, img_bytes)
+                else:
+                    if zf is None:
+                        zf = zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_STORED, allowZip64=True)
+                        add_to_zip(*first_slide)
+                    add_to_zip(img_name, img_bytes)
                     
                 with cols[idx % 3]:
-                    st.image(img_path, caption=f"Slide {slide_num}")
-                    if cloudinary_url: st.caption(f"☁️ [View on Cloudinary]({cloudinary_url})")
+                    st.image(img_bytes, caption=f"Slide {slide_num}")
+                    # Placeholder for the Cloudinary link, filled in once the background upload finishes
+                    if upload_future: uploads.append((upload_future, st.empty()))
+
+            if zf is not None:
+                zf.close()
+
+            # Show everything logged so far before blocking on the uploads
+            render_log()
+            for upload_future, caption_placeholder in uploads:
+                cloudinary_url, _ = upload_future.result()
+                if cloudinary_url:
+                    cloudinary_urls.append(cloudinary_url)
+                    caption_placeholder.caption(f"☁️ [View on Cloudinary]({cloudinary_url})")
 
             if upload_enabled and cloudinary_urls:
                 add_log("💾 Saving record to Airtable...")
-                save_to_airtable(site, mode, cloudinary_urls, country_full_name)
+                pending_records = []
+                enqueue_airtable_record(pending_records, site, mode, cloudinary_urls, country_full_name, run_period)
+                flush_airtable_records(pending_records)
             
-            if captured_files:
+            if captured_count:
                 st.divider()
-                zip_buffer = io.BytesIO()
-                with zipfile.ZipFile(zip_buffer, "w") as zf:
-                    for fpath in captured_files: zf.write(fpath, os.path.basename(fpath))
-                st.download_button(label="📥 Download Banners (ZIP)", data=zip_buffer.getvalue(),
-                                   file_name=f"banners_{site}_{mode}_{datetime.now().strftime('%Y%m%d')}.zip",
-                                   mime="application/zip", use_container_width=True)
-                st.success(f"✅ Capture complete! {len(captured_files)} images saved.")
+                # on_click="ignore": downloading doesn't rerun the script, so the results (and the
+                # archive already sent to the browser) stay on screen instead of being thrown away
+                if captured_count == 1:
+                    first_name, first_bytes = first_slide
+                    st.download_button(label="📥 Download Banner", data=first_bytes, file_name=first_name,
+                                       mime="image/jpeg", on_click="ignore", use_container_width=True)
+                else:
+                    # Hand over the buffer itself: Streamlit takes its bytes with getvalue(), which CPython
+                    # serves from the BytesIO's own storage, so the archive is never duplicated on our side
+                    st.download_button(label="📥 Download Banners (ZIP)", data=zip_buffer,
+                                       file_name=f"banners_{site}_{mode}_{zip_stamp}.zip",
+                                       mime="application/zip", on_click="ignore", use_container_width=True)
+                st.success(f"✅ Capture complete! {captured_count} images saved.")
         else:
-            # Batch process
-            for i, (c_code, c_label) in enumerate(capture_queue):
-                if st.session_state.stop_requested:
-                    add_log("🛑 Capture process stopped by user.")
-                    break
-                    
-                c_full_name = c_label.split(" (")[0]
-                url = f"https://www.lg.com/{c_code}/"
-                
-                add_log(f"🌍 Processing **{c_label}** ({i+1}/{len(capture_queue)})...")
-                cloudinary_urls = []
-                
-                for result in capture_hero_banners(url, c_code, mode, log_callback=add_log, upload_to_cloud=upload_enabled):
-                    _, _, cloudinary_url = result
-                    if cloudinary_url:
-                        cloudinary_urls.append(cloudinary_url)
-                
-                if upload_enabled and cloudinary_urls:
-                    save_to_airtable(c_code, mode, cloudinary_urls, c_full_name)
-                
-                # Manual memory cleanup after each country
-                import gc
-                gc.collect()
-                
-                progress_bar.progress((i + 1) / len(capture_queue))
-            
+            # Batch process: countries run in parallel on the capture pool, while logging
+            # and Airtable writes stay on this thread by draining the shared event queue
+            events = queue.Queue()
+            cancel = threading.Event()
+            futures = [
+                start_capture(f"https://www.lg.com/{c_code}/", c_code, mode, events, tag=(c_code, c_label),
+                              upload_to_cloud=upload_enabled, save_local=save_local, cancel=cancel)
+                for c_code, c_label in capture_queue
+            ]
+            uploads = {c_code: [] for c_code, _ in capture_queue}
+            # Finished countries whose uploads are still running: c_code -> (full name, upload futures)
+            awaiting_uploads = {}
+            pending_records = []
+            started = 0
+            finished = 0
+            last_progress = 0.0
+
+            def collect_uploads(wait=False):
+                # Queue the Airtable record of every country whose uploads are all in, without
+                # stalling the event drain on slower ones; slide order is kept for the URL list
+                for code in list(awaiting_uploads):
+                    full_name, upload_futures = awaiting_uploads[code]
+                    if not wait and not all(f.done() for f in upload_futures):
+                        continue
+                    del awaiting_uploads[code]
+                    cloudinary_urls = [u for u, _ in (f.result() for f in upload_futures) if u]
+                    if cloudinary_urls:
+                        enqueue_airtable_record(pending_records, code, mode, cloudinary_urls, full_name, run_period)
+                        if len(pending_records) >= AIRTABLE_BATCH_SIZE:
+                            add_log(f"💾 Saving {len(pending_records)} records to Airtable...")
+                            flush_airtable_records(pending_records)
+
+            def save_remaining():
+                collect_uploads(wait=True)
+                if pending_records:
+                    add_log(f"💾 Saving {len(pending_records)} records to Airtable...")
+                    flush_airtable_records(pending_records)
+
+            try:
+                while finished < len(capture_queue):
+                    if st.session_state.stop_requested:
+                        add_log("🛑 Capture process stopped by user.")
+                        break
+
+                    try:
+                        (c_code, c_label), kind, payload = events.get(timeout=LOG_RENDER_INTERVAL)
+                    except queue.Empty:
+                        # Quiet spell: show log lines held back by the redraw throttle
+                        collect_uploads()
+                        render_log()
+                        continue
+
+                    if kind == 'start':
+                        started += 1
+                        add_log(f"🌍 Processing **{c_label}** ({started}/{len(capture_queue)})...")
+                    elif kind == 'log':
+                        add_log(f"**{c_code.upper()}** {payload}")
+                    elif kind == 'result':
+                        _, _, _, upload_future = payload
+                        if upload_future:
+                            uploads[c_code].append(upload_future)
+                    elif kind == 'done':
+                        finished += 1
+                        c_full_name = c_label.split(" (")[0]
+
+                        country_uploads = uploads.pop(c_code)
+                        if upload_enabled and country_uploads:
+                            awaiting_uploads[c_code] = (c_full_name, country_uploads)
+                        collect_uploads()
+
+                        # Throttled like the log: parallel workers can finish several countries at once
+                        now = time.monotonic()
+                        if finished == len(capture_queue) or now - last_progress >= PROGRESS_UPDATE_INTERVAL:
+                            progress_bar.progress(finished / len(capture_queue))
+                            last_progress = now
+            finally:
+                # Stop queued countries if the run is interrupted; in-flight ones finish their current country
+                cancel.set()
+                for future in futures:
+                    future.cancel()
+                # Countries that already finished still get their buffered Airtable records when a rerun or
+                # Stop ends the script here: the save runs on an upload thread, which the rerun doesn't interrupt
+                final_save = submit_with_ctx(_upload_executor(), save_remaining)
+
+            final_save.result()
+
             if not st.session_state.stop_requested:
                 add_log("✨ Batch processing complete!")
                 st.success("✅ Selected region/group processed successfully.")
 
+        render_log()
+
 
 if __name__ == "__main__":
     main()